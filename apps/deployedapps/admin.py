@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import DeployedApp
+from .models import ArchivedApp, DeployedApp
 
 
 @admin.register(DeployedApp)
@@ -8,3 +8,10 @@ class DeployedAppAdmin(admin.ModelAdmin):
     list_filter = ['active']
     search_fields = ['id', 'owner__username']
     readonly_fields = ['id', 'created_at']
+
+
+@admin.register(ArchivedApp)
+class ArchivedAppAdmin(admin.ModelAdmin):
+    list_display = ['id', 'owner', 'created_at', 'archived_at']
+    search_fields = ['id', 'owner__username']
+    readonly_fields = ['id', 'created_at', 'archived_at']
@@ -0,0 +1,55 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from apps.deployedapps.models import ArchivedApp, DeployedApp
+
+
+class Command(BaseCommand):
+    help = "Move stale inactive apps from deployed_apps to the archive table"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=30,
+            help="Only archive inactive apps created more than this many days ago",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Only report how many apps would move"
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        stale = DeployedApp.objects.filter(active=False, created_at__lt=cutoff)
+        if options["dry_run"]:
+            self.stdout.write(f"{stale.count()} inactive apps would be archived")
+            return
+
+        moved = 0
+        while batch := self.archive_batch(stale, options["batch_size"]):
+            moved += batch
+            self.stdout.write(f"Archived {moved} apps...")
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} inactive apps"))
+
+    def archive_batch(self, stale, batch_size):
+        archived_at = timezone.now()
+        with transaction.atomic():
+            apps = list(stale.order_by("created_at")[:batch_size])
+            if not apps:
+                return 0
+            ArchivedApp.objects.bulk_create(
+                [
+                    ArchivedApp(
+                        id=app.id,
+                        owner_id=app.owner_id,
+                        active=app.active,
+                        created_at=app.created_at,
+                        archived_at=archived_at,
+                    )
+                    for app in apps
+                ],
+            )
+            DeployedApp.objects.filter(id__in=[app.id for app in apps]).delete()
+        return len(apps)
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:04
+
+import apps.deployedapps.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deployedapps', '0001_initial'),
+        ('users', '0002_username_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedApp',
+            fields=[
+                ('id', models.CharField(default=apps.deployedapps.models.generate_app_id, editable=False, max_length=32, primary_key=True, serialize=False)),
+                ('active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'deployed_apps_archive',
+                'ordering': ['-created_at'],
+                'abstract': False,
+            },
+        ),
+        migrations.AddIndex(
+            model_name='deployedapp',
+            index=models.Index(condition=models.Q(('active', False)), fields=['created_at'], name='deployed_apps_inactive_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedapp',
+            name='owner',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_apps', to='users.user'),
+        ),
+    ]
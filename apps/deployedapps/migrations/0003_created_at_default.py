@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:35
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deployedapps', '0002_archivedapp'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedapp',
+            name='archived_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='archivedapp',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='deployedapp',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
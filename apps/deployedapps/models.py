@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 import secrets
 import string
 
@@ -7,15 +8,35 @@ def generate_app_id():
     return f"app_{''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(16))}"
 
 
-class DeployedApp(models.Model):
+class BaseApp(models.Model):
     id = models.CharField(max_length=32, primary_key=True, default=generate_app_id, editable=False)
-    owner = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='apps')
     active = models.BooleanField(default=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Defaults rather than auto_now_add so imports and archiving keep the values
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
 
     class Meta:
-        db_table = 'deployed_apps'
+        abstract = True
         ordering = ['-created_at']
 
     def __str__(self):
         return f"App {self.id} (Owner: {self.owner.username})"
+
+
+class DeployedApp(BaseApp):
+    owner = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='apps')
+
+    class Meta(BaseApp.Meta):
+        db_table = 'deployed_apps'
+        indexes = [
+            # Lets archive_inactive_apps find stale rows without a table scan
+            models.Index(fields=['created_at'], condition=models.Q(active=False), name='deployed_apps_inactive_idx'),
+        ]
+
+
+class ArchivedApp(BaseApp):
+    """Inactive app moved out of the hot deployed_apps table"""
+    owner = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='archived_apps')
+    archived_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta(BaseApp.Meta):
+        db_table = 'deployed_apps_archive'
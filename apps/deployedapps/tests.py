@@ -1,6 +1,10 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
 from apps.users.models import User, PlanChoices
-from apps.deployedapps.models import DeployedApp
+from apps.deployedapps.models import ArchivedApp, DeployedApp
 
 
 class DeployedAppModelTest(TestCase):
@@ -49,3 +53,40 @@ class DeployedAppModelTest(TestCase):
         app = DeployedApp.objects.create(owner=self.user)
         expected = f"App {app.id} (Owner: {self.user.username})"
         self.assertEqual(str(app), expected)
+
+
+class ArchiveInactiveAppsCommandTest(TestCase):
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create(username="testuser", plan=PlanChoices.HOBBY)
+        old = timezone.now() - timedelta(days=60)
+        self.stale = DeployedApp.objects.create(owner=self.user, active=False)
+        self.active = DeployedApp.objects.create(owner=self.user, active=True)
+        self.recent = DeployedApp.objects.create(owner=self.user, active=False)
+        DeployedApp.objects.filter(id__in=[self.stale.id, self.active.id]).update(
+            created_at=old
+        )
+        self.stale.refresh_from_db()
+
+    def test_archives_stale_inactive_apps(self):
+        """Test that only old inactive apps are moved"""
+        call_command("archive_inactive_apps", days=30, batch_size=1, stdout=StringIO())
+
+        self.assertFalse(DeployedApp.objects.filter(id=self.stale.id).exists())
+        archived = ArchivedApp.objects.get(id=self.stale.id)
+        self.assertEqual(archived.owner, self.user)
+        self.assertEqual(archived.created_at, self.stale.created_at)
+        self.assertIsNotNone(archived.archived_at)
+        self.assertCountEqual(
+            DeployedApp.objects.values_list("id", flat=True),
+            [self.active.id, self.recent.id],
+        )
+
+    def test_dry_run(self):
+        """Test that a dry run does not move anything"""
+        out = StringIO()
+        call_command("archive_inactive_apps", dry_run=True, stdout=out)
+
+        self.assertIn("1 inactive apps would be archived", out.getvalue())
+        self.assertEqual(DeployedApp.objects.count(), 3)
+        self.assertFalse(ArchivedApp.objects.exists())
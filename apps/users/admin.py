@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import User
+from django.db.models import Q
+from .models import PlanChangeEvent, User
+from .search import username_match
 
 
 @admin.register(User)
@@ -8,3 +10,18 @@ class UserAdmin(admin.ModelAdmin):
     list_filter = ["plan"]
     search_fields = ["username", "id"]
     readonly_fields = ["id", "created_at"]
+
+    def get_search_results(self, request, queryset, search_term):
+        # Use the username FTS index instead of LIKE '%term%' scans
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        return queryset.filter(username_match(search_term) | Q(id=search_term)), False
+
+
+@admin.register(PlanChangeEvent)
+class PlanChangeEventAdmin(admin.ModelAdmin):
+    list_display = ["id", "user_id", "old_plan", "new_plan", "created_at", "delivered_at", "attempts"]
+    list_filter = ["new_plan"]
+    search_fields = ["user_id"]
+    readonly_fields = ["created_at", "delivered_at", "attempts", "last_error"]
@@ -0,0 +1,22 @@
+from django.core.checks import Error, Tags, register
+from django.db import connections
+from .search import missing_search_triggers
+
+
+@register(Tags.database)
+def check_search_triggers(app_configs, databases=None, **kwargs):
+    """Fail if a rebuild of ``users`` dropped the FTS sync triggers"""
+    errors = []
+    for alias in databases or []:
+        if connections[alias].vendor != "sqlite":
+            continue
+        missing = missing_search_triggers(alias)
+        if missing:
+            errors.append(
+                Error(
+                    f"Username search triggers missing: {', '.join(missing)}",
+                    hint="Run 'manage.py rebuild_search_index'.",
+                    id="users.E001",
+                )
+            )
+    return errors
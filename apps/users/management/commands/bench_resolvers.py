@@ -0,0 +1,58 @@
+import asyncio
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from apps.users.models import User
+from apps.deployedapps.models import DeployedApp
+from config.schema import schema
+
+QUERY = "query bench { users { id apps { id owner { id } } } }"
+
+
+class Command(BaseCommand):
+    help = "Compare per-item resolver overhead with and without selection prefetching"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10000)
+        parser.add_argument("--apps-per-user", type=int, default=2)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        # Never touch the configured database: run against a throwaway test
+        # database (in-memory for SQLite) that is destroyed afterwards.
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.create_data(options["users"], options["apps_per_user"])
+            for label, prefetch in [("loaders", False), ("prefetch", True)]:
+                with override_settings(GRAPHQL_PREFETCH_SELECTIONS=prefetch):
+                    runs = [self.run_query() for _ in range(options["repeat"])]
+                best, items = min(runs)
+                self.stdout.write(
+                    f"{label:>8}: {best * 1000:.0f}ms for {items} items, "
+                    f"{best / max(items, 1) * 1e6:.2f}us per resolved item"
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def create_data(self, users, apps_per_user):
+        owners = User.objects.bulk_create(
+            [User(username=f"bench_user_{i}") for i in range(users)], batch_size=1000
+        )
+        DeployedApp.objects.bulk_create(
+            [DeployedApp(owner=owner) for owner in owners for _ in range(apps_per_user)],
+            batch_size=1000,
+        )
+
+    def run_query(self):
+        """Return the elapsed time and the number of resolved objects"""
+        started = time.perf_counter()
+        result = asyncio.run(schema.execute(QUERY))
+        elapsed = time.perf_counter() - started
+        if result.errors:
+            raise result.errors[0]
+        users = result.data["users"]
+        # Every app resolves itself and its owner
+        items = len(users) + 2 * sum(len(user["apps"]) for user in users)
+        return elapsed, items
@@ -0,0 +1,58 @@
+import asyncio
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from apps.users.outbox import OutboxDispatcher, configured_sinks
+
+
+class Command(BaseCommand):
+    help = "Deliver plan change events from the outbox to the configured sinks"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once", action="store_true", help="Exit once no events are due"
+        )
+        parser.add_argument("--batch-size", type=int, default=settings.OUTBOX_BATCH_SIZE)
+        parser.add_argument(
+            "--poll-interval", type=float, default=settings.OUTBOX_POLL_INTERVAL
+        )
+        parser.add_argument(
+            "--backoff",
+            type=float,
+            default=settings.OUTBOX_BACKOFF,
+            help="Seconds before the first retry; doubles on every attempt",
+        )
+        parser.add_argument(
+            "--retry-failed",
+            action="store_true",
+            help="Requeue events that used up all their attempts before dispatching",
+        )
+        parser.add_argument(
+            "--report-interval",
+            type=float,
+            default=60,
+            help="Seconds between pending/lag reports",
+        )
+
+    def handle(self, *args, **options):
+        dispatcher = OutboxDispatcher(
+            configured_sinks(),
+            batch_size=options["batch_size"],
+            max_attempts=settings.OUTBOX_MAX_ATTEMPTS,
+            backoff=options["backoff"],
+        )
+        asyncio.run(self.dispatch(dispatcher, options))
+
+    async def dispatch(self, dispatcher, options):
+        if options["retry_failed"]:
+            requeued = await dispatcher.requeue_failed()
+            self.stdout.write(f"Requeued {requeued} failed events")
+        await dispatcher.run(
+            poll_interval=options["poll_interval"],
+            report_interval=options["report_interval"],
+            once=options["once"],
+        )
+        stats = await dispatcher.report()
+        self.stdout.write(
+            f"{stats['pending']} events pending, delivery lag {stats['lag']:.3f}s; "
+            f"{stats['failed']} failed, oldest {stats['failed_lag']:.3f}s"
+        )
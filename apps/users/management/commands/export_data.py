@@ -0,0 +1,46 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from config.transfer import FORMATS, MODELS, serialize, write_rows
+
+
+class Command(BaseCommand):
+    help = "Stream users and apps to JSONL or CSV without loading them into memory"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "models", nargs="*", help=f"Models to export: {', '.join(MODELS)} (default: all)"
+        )
+        parser.add_argument("--format", choices=FORMATS, default="jsonl")
+        parser.add_argument("--output", "-o", help="Output file (default: stdout)")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        labels = options["models"] or list(MODELS)
+        unknown = set(labels) - set(MODELS)
+        if unknown:
+            raise CommandError(f"Unknown models: {', '.join(sorted(unknown))}")
+        labels = [label for label in MODELS if label in labels]
+        if options["format"] == "csv" and len(labels) != 1:
+            raise CommandError("CSV export needs exactly one model")
+
+        output = options["output"]
+        stream = open(output, "w", newline="") if output else self.stdout
+        # Keep progress off stdout when it carries the data
+        log = self.stdout if output else self.stderr
+        try:
+            for label in labels:
+                model = MODELS[label]
+                started = time.monotonic()
+                queryset = model.objects.order_by("pk").iterator(
+                    chunk_size=options["chunk_size"]
+                )
+                rows = (serialize(model, obj) for obj in queryset)
+                count = write_rows(options["format"], stream, label, model, rows)
+                elapsed = time.monotonic() - started
+                log.write(
+                    f"Exported {count} {label} in {elapsed:.1f}s "
+                    f"({count / max(elapsed, 1e-6):.0f} rows/s)"
+                )
+        finally:
+            if output:
+                stream.close()
@@ -0,0 +1,80 @@
+import sys
+import time
+from itertools import islice
+from django.core.management.base import BaseCommand, CommandError
+from config.transfer import FORMATS, MODELS, deserialize, read_rows
+
+
+class Command(BaseCommand):
+    help = "Upsert users and apps from a JSONL or CSV stream in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--input", "-i", help="Input file (default: stdin)")
+        parser.add_argument("--format", choices=FORMATS, default="jsonl")
+        parser.add_argument(
+            "--model", choices=list(MODELS), help="Model contained in a CSV file"
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--offset",
+            type=int,
+            default=0,
+            help="Skip this many records, e.g. to resume an interrupted import",
+        )
+
+    def handle(self, *args, **options):
+        if options["format"] == "csv" and not options["model"]:
+            raise CommandError("CSV import needs --model")
+
+        self.verbosity = options["verbosity"]
+        path = options["input"]
+        stream = open(path, newline="") if path else sys.stdin
+        try:
+            rows = read_rows(options["format"], stream, options["model"])
+            self.offset = options["offset"]
+            self.started = time.monotonic()
+            self.imported = 0
+            self.import_rows(islice(rows, self.offset, None), options["batch_size"])
+        finally:
+            if path:
+                stream.close()
+
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {self.imported} records in {elapsed:.1f}s "
+                f"({self.imported / max(elapsed, 1e-6):.0f} rows/s)"
+            )
+        )
+
+    def import_rows(self, rows, batch_size):
+        label, batch = None, []
+        for row_label, row in rows:
+            if row_label not in MODELS:
+                raise CommandError(f"Unknown model {row_label!r}")
+            if batch and (row_label != label or len(batch) >= batch_size):
+                self.flush(label, batch)
+                batch = []
+            label = row_label
+            batch.append(deserialize(MODELS[label], row))
+        if batch:
+            self.flush(label, batch)
+
+    def flush(self, label, batch):
+        model = MODELS[label]
+        pk = model._meta.pk
+        update_fields = [f.name for f in model._meta.concrete_fields if f is not pk]
+        model.objects.bulk_create(
+            batch,
+            update_conflicts=True,
+            unique_fields=[pk.name],
+            update_fields=update_fields,
+        )
+        self.imported += len(batch)
+        elapsed = time.monotonic() - self.started
+        if self.verbosity >= 1:
+            self.stdout.write(
+                f"{label}: {self.imported} records committed "
+                f"(resume with --offset {self.offset + self.imported}, "
+                f"{self.imported / max(elapsed, 1e-6):.0f} rows/s)"
+            )
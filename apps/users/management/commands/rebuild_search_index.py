@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+from apps.users.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Recreate the username search triggers and repopulate the FTS index"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        rebuild_search_index(options["database"])
+        self.stdout.write(self.style.SUCCESS("Rebuilt the username search index"))
@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                "CREATE VIRTUAL TABLE users_username_fts USING fts5("
+                "username, user_id UNINDEXED, tokenize='trigram')",
+                "INSERT INTO users_username_fts(rowid, username, user_id) "
+                "SELECT rowid, username, id FROM users",
+                "CREATE TRIGGER users_username_fts_ai AFTER INSERT ON users BEGIN "
+                "INSERT INTO users_username_fts(rowid, username, user_id) "
+                "VALUES (new.rowid, new.username, new.id); END",
+                "CREATE TRIGGER users_username_fts_ad AFTER DELETE ON users BEGIN "
+                "DELETE FROM users_username_fts WHERE rowid = old.rowid; END",
+                "CREATE TRIGGER users_username_fts_au AFTER UPDATE OF username, id ON users BEGIN "
+                "DELETE FROM users_username_fts WHERE rowid = old.rowid; "
+                "INSERT INTO users_username_fts(rowid, username, user_id) "
+                "VALUES (new.rowid, new.username, new.id); END",
+            ],
+            reverse_sql=[
+                "DROP TRIGGER IF EXISTS users_username_fts_au",
+                "DROP TRIGGER IF EXISTS users_username_fts_ad",
+                "DROP TRIGGER IF EXISTS users_username_fts_ai",
+                "DROP TABLE IF EXISTS users_username_fts",
+            ],
+        ),
+    ]
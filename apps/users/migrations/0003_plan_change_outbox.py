@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_username_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlanChangeEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.CharField(db_index=True, max_length=32)),
+                ('old_plan', models.CharField(choices=[('HOBBY', 'Hobby'), ('PRO', 'Pro')], max_length=10)),
+                ('new_plan', models.CharField(choices=[('HOBBY', 'Hobby'), ('PRO', 'Pro')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('delivered_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+            ],
+            options={
+                'db_table': 'plan_change_outbox',
+                'ordering': ['id'],
+                'indexes': [models.Index(condition=models.Q(('delivered_at__isnull', True)), fields=['next_attempt_at'], name='plan_change_outbox_pending_idx')],
+            },
+        ),
+    ]
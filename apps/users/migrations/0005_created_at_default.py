@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:35
+
+import django.utils.timezone
+from django.db import migrations, models
+from apps.users.search import rebuild_search_index_migration
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_username_lower_index'),
+    ]
+
+    # SQLite rebuilds users for the AlterField, dropping the search triggers,
+    # so recreate them after it in both directions.
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, rebuild_search_index_migration),
+        migrations.AlterField(
+            model_name='user',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.RunPython(rebuild_search_index_migration, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models.functions import Lower
+from django.utils import timezone
 import secrets
 import string
 
@@ -20,11 +22,53 @@ class User(models.Model):
     plan = models.CharField(
         max_length=10, choices=PlanChoices.choices, default=PlanChoices.HOBBY
     )
-    created_at = models.DateTimeField(auto_now_add=True)
+    # A default rather than auto_now_add so import_data can keep exported values
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
 
     class Meta:
         db_table = "users"
         ordering = ["-created_at"]
+        indexes = [
+            # Case-insensitive prefix search, see apps.users.search
+            models.Index(Lower("username"), name="users_username_lower_idx"),
+        ]
 
     def __str__(self):
         return f"{self.username} ({self.plan})"
+
+
+class PlanChangeEvent(models.Model):
+    """Outbox row written in the same transaction as a plan change"""
+
+    user_id = models.CharField(max_length=32, db_index=True)
+    old_plan = models.CharField(max_length=10, choices=PlanChoices.choices)
+    new_plan = models.CharField(max_length=10, choices=PlanChoices.choices)
+    created_at = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        db_table = "plan_change_outbox"
+        ordering = ["id"]
+        indexes = [
+            # Only undelivered events are ever polled by the dispatcher
+            models.Index(
+                fields=["next_attempt_at"],
+                condition=models.Q(delivered_at__isnull=True),
+                name="plan_change_outbox_pending_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.old_plan} -> {self.new_plan}"
+
+    def payload(self):
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "old_plan": self.old_plan,
+            "new_plan": self.new_plan,
+            "created_at": self.created_at.isoformat(),
+        }
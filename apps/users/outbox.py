@@ -0,0 +1,207 @@
+import asyncio
+import json
+import logging
+import urllib.request
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import PlanChangeEvent, PlanChoices, User
+
+logger = logging.getLogger("apps.users.outbox")
+
+
+def change_plan(user, plan):
+    """
+    Move ``user`` to ``plan`` and record the change in the outbox atomically.
+
+    The plan is switched with a conditional UPDATE, so of several concurrent
+    calls only the one that actually changed the row writes an event.
+    Returns False if the user was already on ``plan``.
+    """
+    changed = 0
+    with transaction.atomic():
+        for old_plan in PlanChoices.values:
+            if old_plan == plan:
+                continue
+            changed = User.objects.filter(id=user.id, plan=old_plan).update(plan=plan)
+            if changed:
+                PlanChangeEvent.objects.create(
+                    user_id=user.id, old_plan=old_plan, new_plan=plan
+                )
+                break
+    user.plan = plan
+    return bool(changed)
+
+
+class FileSink:
+    """Append events as JSON lines to a local file"""
+
+    def __init__(self, path):
+        self.path = path
+
+    async def deliver(self, payloads):
+        await asyncio.to_thread(self._write, payloads)
+
+    def _write(self, payloads):
+        with open(self.path, "a") as f:
+            for payload in payloads:
+                f.write(json.dumps(payload) + "\n")
+
+
+class QueueSink:
+    """Put events on an in-process asyncio queue"""
+
+    def __init__(self, queue=None):
+        self.queue = queue if queue is not None else asyncio.Queue()
+
+    async def deliver(self, payloads):
+        for payload in payloads:
+            await self.queue.put(payload)
+
+
+class WebhookSink:
+    """POST each batch as ``{"events": [...]}``; any non-2xx response fails it"""
+
+    def __init__(self, url, timeout=5.0, headers=None):
+        self.url = url
+        self.timeout = timeout
+        self.headers = {"Content-Type": "application/json", **(headers or {})}
+
+    async def deliver(self, payloads):
+        await asyncio.to_thread(self._post, payloads)
+
+    def _post(self, payloads):
+        body = json.dumps({"events": payloads}).encode()
+        request = urllib.request.Request(self.url, data=body, headers=self.headers)
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+def configured_sinks():
+    """Instantiate the sinks listed in ``settings.OUTBOX_SINKS``"""
+    return [import_string(path)(**kwargs) for path, kwargs in settings.OUTBOX_SINKS]
+
+
+class OutboxDispatcher:
+    """
+    Drain undelivered plan-change events to ``sinks`` in batches.
+
+    A batch counts as delivered once every sink accepted it; otherwise each
+    event is retried with exponential backoff until ``max_attempts``, so
+    sinks must tolerate duplicates (delivery is at least once). Events of a
+    user are delivered in the order they were written: while one is backing
+    off, that user's newer events wait for it. Events that run out of
+    attempts are kept as failed (and no longer hold back newer ones), reported
+    separately and can be put back with ``requeue_failed``.
+    """
+
+    def __init__(self, sinks, batch_size=100, max_attempts=10, backoff=30.0):
+        self.sinks = sinks
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+
+    def pending(self):
+        return PlanChangeEvent.objects.filter(
+            delivered_at__isnull=True, attempts__lt=self.max_attempts
+        )
+
+    def failed(self):
+        """Undelivered events that used up all their attempts"""
+        return PlanChangeEvent.objects.filter(
+            delivered_at__isnull=True, attempts__gte=self.max_attempts
+        )
+
+    async def lag(self, queryset=None):
+        """Seconds since the oldest event in ``queryset`` (default: pending) was written"""
+        queryset = self.pending() if queryset is None else queryset
+        oldest = await queryset.order_by("id").afirst()
+        if oldest is None:
+            return 0.0
+        return (timezone.now() - oldest.created_at).total_seconds()
+
+    async def requeue_failed(self):
+        """Give failed events a fresh set of attempts; returns how many"""
+        return await self.failed().aupdate(attempts=0, next_attempt_at=timezone.now())
+
+    async def dispatch_batch(self):
+        """Deliver one batch of due events; returns how many were attempted"""
+        now = timezone.now()
+        backing_off = self.pending().filter(
+            user_id=OuterRef("user_id"), id__lt=OuterRef("id"), next_attempt_at__gt=now
+        )
+        due = (
+            self.pending()
+            .filter(next_attempt_at__lte=now)
+            .exclude(Exists(backing_off))
+            .order_by("id")[: self.batch_size]
+        )
+        events = [event async for event in due]
+        if not events:
+            return 0
+        payloads = [event.payload() for event in events]
+        try:
+            for sink in self.sinks:
+                await sink.deliver(payloads)
+        except Exception as exc:
+            await self._retry_later(events, exc)
+            return len(events)
+
+        delivered_at = timezone.now()
+        await PlanChangeEvent.objects.filter(id__in=[e.id for e in events]).aupdate(
+            delivered_at=delivered_at
+        )
+        lag = max((delivered_at - e.created_at).total_seconds() for e in events)
+        logger.info("Delivered %d plan change events (max lag %.3fs)", len(events), lag)
+        return len(events)
+
+    async def _retry_later(self, events, exc):
+        now = timezone.now()
+        for event in events:
+            event.attempts += 1
+            event.last_error = repr(exc)
+            event.next_attempt_at = now + timedelta(
+                seconds=self.backoff * 2 ** (event.attempts - 1)
+            )
+            if event.attempts >= self.max_attempts:
+                logger.error("Giving up on plan change event %s: %r", event.id, exc)
+        await PlanChangeEvent.objects.abulk_update(
+            events, ["attempts", "last_error", "next_attempt_at"]
+        )
+        logger.warning("Delivering %d plan change events failed: %r", len(events), exc)
+
+    async def report(self):
+        stats = {
+            "pending": await self.pending().acount(),
+            "lag": await self.lag(),
+            "failed": await self.failed().acount(),
+            "failed_lag": await self.lag(self.failed()),
+        }
+        logger.info(
+            "Outbox: %d pending events, delivery lag %.3fs", stats["pending"], stats["lag"]
+        )
+        if stats["failed"]:
+            logger.error(
+                "Outbox: %d failed events (oldest %.3fs), requeue with --retry-failed",
+                stats["failed"],
+                stats["failed_lag"],
+            )
+        return stats
+
+    async def run(self, poll_interval=1.0, report_interval=60.0, once=False):
+        """Dispatch until stopped; with ``once``, stop when nothing is due"""
+        loop = asyncio.get_running_loop()
+        next_report = loop.time() + report_interval
+        while True:
+            dispatched = await self.dispatch_batch()
+            if loop.time() >= next_report:
+                await self.report()
+                next_report = loop.time() + report_interval
+            if dispatched:
+                continue
+            if once:
+                return
+            await asyncio.sleep(poll_interval)
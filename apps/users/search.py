@@ -0,0 +1,137 @@
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Lower
+from django.db.models.lookups import GreaterThanOrEqual, LessThan
+from .models import User
+
+# FTS5 table kept in sync with ``users.username`` by the triggers created in
+# migration 0002. It uses the trigram tokenizer, so any substring of three or
+# more characters can be answered from the index instead of a LIKE scan.
+FTS_TABLE = "users_username_fts"
+MIN_TRIGRAM_LENGTH = 3
+MAX_RESULTS = 100
+
+# The sync triggers, as created by migration 0002. See rebuild_search_index
+# for when they have to be recreated.
+SEARCH_TRIGGERS = {
+    "users_username_fts_ai": (
+        "CREATE TRIGGER users_username_fts_ai AFTER INSERT ON users BEGIN "
+        f"INSERT INTO {FTS_TABLE}(rowid, username, user_id) "
+        "VALUES (new.rowid, new.username, new.id); END"
+    ),
+    "users_username_fts_ad": (
+        "CREATE TRIGGER users_username_fts_ad AFTER DELETE ON users BEGIN "
+        f"DELETE FROM {FTS_TABLE} WHERE rowid = old.rowid; END"
+    ),
+    "users_username_fts_au": (
+        "CREATE TRIGGER users_username_fts_au AFTER UPDATE OF username, id ON users BEGIN "
+        f"DELETE FROM {FTS_TABLE} WHERE rowid = old.rowid; "
+        f"INSERT INTO {FTS_TABLE}(rowid, username, user_id) "
+        "VALUES (new.rowid, new.username, new.id); END"
+    ),
+}
+
+
+def _fts_phrase(term):
+    """Quote a user supplied term as a single FTS5 phrase"""
+    return '"{}"'.format(term.replace('"', '""'))
+
+
+def username_prefix(prefix):
+    """
+    Match usernames starting with ``prefix``, ignoring case like the FTS
+    index does. The range on LOWER(username) is served by
+    users_username_lower_idx.
+
+    Both sides are folded with SQLite's LOWER(), which only folds ASCII;
+    folding the prefix in Python as well would make non-ASCII prefixes
+    match nothing.
+    """
+    return Q(
+        GreaterThanOrEqual(Lower("username"), Lower(Value(prefix))),
+        LessThan(Lower("username"), Lower(Value(prefix + "\U0010ffff"))),
+    )
+
+
+def username_match(term):
+    """
+    Match usernames containing ``term``.
+
+    Terms shorter than a trigram cannot be looked up in the FTS index, so
+    they fall back to an (indexed) prefix match.
+    """
+    if len(term) < MIN_TRIGRAM_LENGTH:
+        return username_prefix(term)
+    return Q(
+        pk__in=RawSQL(
+            f"SELECT user_id FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+            [_fts_phrase(term)],
+        )
+    )
+
+
+def search_users(term, first=20, offset=0, prefix=False):
+    """
+    Return up to ``first`` users matching ``term``, best matches first.
+
+    Substring matches are ranked by FTS5's bm25; prefix matches (and terms
+    too short for the trigram index) are ordered by username.
+    """
+    first = max(0, min(first, MAX_RESULTS))
+    offset = max(0, offset)
+    if not term or not first:
+        return []
+    if prefix or len(term) < MIN_TRIGRAM_LENGTH:
+        queryset = User.objects.filter(username_prefix(term)).order_by(
+            Lower("username"), "username"
+        )
+        return list(queryset[offset : offset + first])
+    sql = (
+        f"SELECT u.* FROM {FTS_TABLE} f JOIN users u ON u.id = f.user_id "
+        f"WHERE {FTS_TABLE} MATCH %s ORDER BY f.rank, u.username LIMIT %s OFFSET %s"
+    )
+    return list(User.objects.raw(sql, [_fts_phrase(term), first, offset]))
+
+
+def missing_search_triggers(using=DEFAULT_DB_ALIAS):
+    """
+    Names of the sync triggers missing from the ``using`` database, or an
+    empty list if the FTS table has not been created yet.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT type, name FROM sqlite_master WHERE name = %s OR type = 'trigger'",
+            [FTS_TABLE],
+        )
+        found = {name for _, name in cursor.fetchall()}
+    if FTS_TABLE not in found:
+        return []
+    return [name for name in SEARCH_TRIGGERS if name not in found]
+
+
+def rebuild_search_index(using=DEFAULT_DB_ALIAS):
+    """
+    Recreate the sync triggers and repopulate the FTS table from ``users``.
+
+    The triggers address FTS rows by the ``users`` rowid, which SQLite
+    renumbers on VACUUM and which does not survive Django rebuilding the
+    table (as it does for most AlterField operations on SQLite). Rebuilding
+    ``users`` also drops the triggers, so every migration that alters the
+    table must recreate them with ``rebuild_search_index_migration`` after
+    the change, in both directions (see users migration 0005).
+    """
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        for name, sql in SEARCH_TRIGGERS.items():
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(sql)
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}(rowid, username, user_id) "
+            "SELECT rowid, username, id FROM users"
+        )
+
+
+def rebuild_search_index_migration(apps, schema_editor):
+    """``RunPython`` entry point for migrations that rebuild ``users``"""
+    rebuild_search_index(schema_editor.connection.alias)
@@ -1,5 +1,15 @@
-from django.test import TestCase
-from apps.users.models import User, PlanChoices
+import os
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, modify_settings
+from django.utils import timezone
+from apps.deployedapps.models import DeployedApp
+from apps.users.models import PlanChangeEvent, User, PlanChoices
+from apps.users.checks import check_search_triggers
+from apps.users.outbox import FileSink, OutboxDispatcher, QueueSink, change_plan
+from apps.users.search import search_users, rebuild_search_index
 
 
 class UserModelTest(TestCase):
@@ -34,3 +44,288 @@ class UserModelTest(TestCase):
         """Test string representation of user"""
         user = User.objects.create(username="testuser", plan=PlanChoices.PRO)
         self.assertEqual(str(user), "testuser (PRO)")
+
+
+class UserSearchTest(TestCase):
+    def setUp(self):
+        """Set up test data"""
+        for name in ["alice", "alicia", "malice", "bob", "bobby_tables"]:
+            User.objects.create(username=name)
+
+    def usernames(self, *args, **kwargs):
+        return [u.username for u in search_users(*args, **kwargs)]
+
+    def test_substring_search(self):
+        """Test that substring search uses the trigram index"""
+        self.assertCountEqual(self.usernames("lic"), ["alice", "alicia", "malice"])
+        self.assertEqual(self.usernames("tables"), ["bobby_tables"])
+
+    def test_search_is_case_insensitive(self):
+        """Test that search ignores case"""
+        self.assertCountEqual(self.usernames("ALIC"), ["alice", "alicia", "malice"])
+
+    def test_prefix_search_is_case_insensitive(self):
+        """Test that prefix lookups and short terms also ignore case"""
+        self.assertEqual(self.usernames("ALI", prefix=True), ["alice", "alicia"])
+        self.assertEqual(self.usernames("AL"), ["alice", "alicia"])
+        User.objects.create(username="Bobcat")
+        self.assertEqual(self.usernames("bo"), ["bob", "bobby_tables", "Bobcat"])
+
+    def test_prefix_search_non_ascii(self):
+        """Test that prefix lookups match non-ASCII usernames"""
+        User.objects.create(username="Émile")
+        User.objects.create(username="ÉMILIA")
+        self.assertEqual(self.usernames("ÉMI", prefix=True), ["Émile", "ÉMILIA"])
+        self.assertEqual(self.usernames("É"), ["Émile", "ÉMILIA"])
+
+    def test_prefix_search(self):
+        """Test prefix lookups and short-term fallback"""
+        self.assertEqual(self.usernames("ali", prefix=True), ["alice", "alicia"])
+        self.assertEqual(self.usernames("bo"), ["bob", "bobby_tables"])
+
+    def test_pagination(self):
+        """Test first/offset pagination"""
+        self.assertEqual(self.usernames("b", first=1), ["bob"])
+        self.assertEqual(self.usernames("b", first=1, offset=1), ["bobby_tables"])
+        self.assertEqual(self.usernames("b", first=0), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        """Test that triggers keep the index in sync"""
+        user = User.objects.get(username="bob")
+        user.username = "robert"
+        user.save()
+        self.assertEqual(self.usernames("obert"), ["robert"])
+        self.assertEqual(self.usernames("bob", prefix=True), ["bobby_tables"])
+        user.delete()
+        self.assertEqual(self.usernames("obert"), [])
+
+    def test_rebuild_search_index(self):
+        """Test rebuilding the index from the users table"""
+        rebuild_search_index()
+        self.assertCountEqual(self.usernames("lic"), ["alice", "alicia", "malice"])
+
+    def test_missing_triggers_are_reported_and_recreated(self):
+        """Test the system check for dropped sync triggers and the rebuild command"""
+        self.assertEqual(check_search_triggers(None, databases=["default"]), [])
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER users_username_fts_ai")
+        errors = check_search_triggers(None, databases=["default"])
+        self.assertEqual([e.id for e in errors], ["users.E001"])
+        self.assertIn("users_username_fts_ai", errors[0].msg)
+
+        call_command("rebuild_search_index", stdout=StringIO())
+
+        self.assertEqual(check_search_triggers(None, databases=["default"]), [])
+        User.objects.create(username="alistair")
+        self.assertEqual(self.usernames("listair"), ["alistair"])
+
+
+@modify_settings(INSTALLED_APPS={"append": "django.contrib.admin.apps.SimpleAdminConfig"})
+class UserAdminSearchTest(TestCase):
+    def setUp(self):
+        """Set up test data"""
+        from django.contrib import admin
+        from apps.users.admin import UserAdmin
+
+        self.model_admin = UserAdmin(User, admin.site)
+        for name in ["alice", "malice", "bob", "bobby_tables"]:
+            User.objects.create(username=name)
+
+    def search(self, term):
+        queryset, may_have_duplicates = self.model_admin.get_search_results(
+            None, User.objects.all(), term
+        )
+        self.assertFalse(may_have_duplicates)
+        return sorted(user.username for user in queryset)
+
+    def test_admin_search_reuses_user_search(self):
+        """Test substring, short prefix and exact id terms in the admin"""
+        self.assertEqual(self.search("lice"), ["alice", "malice"])
+        self.assertEqual(self.search("BO"), ["bob", "bobby_tables"])
+        bob = User.objects.get(username="bob")
+        self.assertEqual(self.search(f" {bob.id} "), ["bob"])
+        self.assertEqual(self.search(""), ["alice", "bob", "bobby_tables", "malice"])
+
+
+class ExportImportCommandTest(TestCase):
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create(username="exported", plan=PlanChoices.PRO)
+        self.app = DeployedApp.objects.create(owner=self.user, active=False)
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = os.path.join(tmpdir.name, "dump")
+
+    def run_command(self, *args, **options):
+        out = StringIO()
+        call_command(*args, stdout=out, stderr=StringIO(), **options)
+        return out.getvalue()
+
+    def test_jsonl_round_trip(self):
+        """Test exporting and re-importing users and apps"""
+        created_at = self.user.created_at
+        self.run_command("export_data", output=self.path)
+        User.objects.all().delete()
+
+        output = self.run_command("import_data", input=self.path, batch_size=1)
+
+        user = User.objects.get(id=self.user.id)
+        self.assertEqual(user.username, "exported")
+        self.assertEqual(user.plan, PlanChoices.PRO)
+        self.assertEqual(user.created_at, created_at)
+        app = DeployedApp.objects.get(id=self.app.id)
+        self.assertEqual(app.owner_id, self.user.id)
+        self.assertFalse(app.active)
+        self.assertIn("Imported 2 records", output)
+
+    def test_import_upserts_existing_rows(self):
+        """Test that importing over existing rows updates them"""
+        self.run_command("export_data", "users", format="csv", output=self.path)
+        User.objects.filter(id=self.user.id).update(plan=PlanChoices.HOBBY)
+
+        self.run_command("import_data", input=self.path, format="csv", model="users")
+
+        self.assertEqual(User.objects.count(), 1)
+        self.assertEqual(User.objects.get(id=self.user.id).plan, PlanChoices.PRO)
+
+    def test_import_resumes_from_offset(self):
+        """Test skipping already imported records"""
+        self.run_command("export_data", output=self.path)
+        DeployedApp.objects.all().delete()
+        User.objects.filter(id=self.user.id).update(username="renamed")
+
+        self.run_command("import_data", input=self.path, offset=1)
+
+        self.assertEqual(User.objects.get(id=self.user.id).username, "renamed")
+        self.assertTrue(DeployedApp.objects.filter(id=self.app.id).exists())
+
+
+class FailingSink:
+    async def deliver(self, payloads):
+        raise ConnectionError("sink unavailable")
+
+
+class FlakySink(QueueSink):
+    """Fails the first ``failures`` deliveries, then queues events"""
+
+    def __init__(self, failures=1):
+        super().__init__()
+        self.failures = failures
+
+    async def deliver(self, payloads):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("sink unavailable")
+        await super().deliver(payloads)
+
+
+class PlanChangeOutboxTest(TestCase):
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create(username="outboxuser")
+
+    def test_change_plan_writes_event(self):
+        """Test that a plan change and its event are saved together"""
+        change_plan(self.user, PlanChoices.PRO)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.plan, PlanChoices.PRO)
+        event = PlanChangeEvent.objects.get()
+        self.assertEqual(event.payload()["user_id"], self.user.id)
+        self.assertEqual((event.old_plan, event.new_plan), ("HOBBY", "PRO"))
+
+    def test_concurrent_changes_write_one_event(self):
+        """Test that stale reads of the same user only record one change"""
+        first = User.objects.get(id=self.user.id)
+        second = User.objects.get(id=self.user.id)
+
+        self.assertTrue(change_plan(first, PlanChoices.PRO))
+        self.assertFalse(change_plan(second, PlanChoices.PRO))
+
+        self.assertEqual(PlanChangeEvent.objects.count(), 1)
+        self.assertEqual(second.plan, PlanChoices.PRO)
+
+    async def test_dispatch_delivers_in_batches(self):
+        """Test that events are drained to every sink in order"""
+        for plan in [PlanChoices.PRO, PlanChoices.HOBBY, PlanChoices.PRO]:
+            await PlanChangeEvent.objects.acreate(
+                user_id=self.user.id, old_plan=self.user.plan, new_plan=plan
+            )
+        sink = QueueSink()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "events.jsonl")
+            dispatcher = OutboxDispatcher([sink, FileSink(path)], batch_size=2)
+
+            await dispatcher.run(once=True)
+
+            with open(path) as f:
+                self.assertEqual(len(f.readlines()), 3)
+        delivered = [sink.queue.get_nowait()["new_plan"] for _ in range(3)]
+        self.assertEqual(delivered, ["PRO", "HOBBY", "PRO"])
+        self.assertFalse(await dispatcher.pending().aexists())
+        self.assertEqual(await dispatcher.lag(), 0.0)
+
+    async def test_failed_delivery_is_retried_with_backoff(self):
+        """Test bounded retries when a sink fails"""
+        event = await PlanChangeEvent.objects.acreate(
+            user_id=self.user.id, old_plan="HOBBY", new_plan="PRO"
+        )
+        dispatcher = OutboxDispatcher([FailingSink()], max_attempts=2, backoff=0)
+
+        await dispatcher.run(once=True)
+
+        await event.arefresh_from_db()
+        self.assertEqual(event.attempts, 2)
+        self.assertIn("sink unavailable", event.last_error)
+        self.assertIsNone(event.delivered_at)
+        # Exhausted events are no longer pending but reported as failed
+        self.assertFalse(await dispatcher.pending().aexists())
+        stats = await dispatcher.report()
+        self.assertEqual((stats["pending"], stats["failed"]), (0, 1))
+        self.assertGreater(stats["failed_lag"], 0.0)
+
+    async def test_backed_off_event_holds_back_newer_events_of_its_user(self):
+        """Test that a user's events are delivered in order across retries"""
+        other = await User.objects.acreate(username="unrelated")
+        sink = FlakySink()
+        dispatcher = OutboxDispatcher([sink], backoff=30)
+        upgrade = await PlanChangeEvent.objects.acreate(
+            user_id=self.user.id, old_plan="HOBBY", new_plan="PRO"
+        )
+        self.assertEqual(await dispatcher.dispatch_batch(), 1)  # fails, backs off
+        downgrade = await PlanChangeEvent.objects.acreate(
+            user_id=self.user.id, old_plan="PRO", new_plan="HOBBY"
+        )
+        unrelated = await PlanChangeEvent.objects.acreate(
+            user_id=other.id, old_plan="HOBBY", new_plan="PRO"
+        )
+
+        # The sink is back, but the upgrade is still backing off
+        await dispatcher.run(once=True)
+        self.assertEqual(sink.queue.get_nowait()["id"], unrelated.id)
+        self.assertTrue(sink.queue.empty())
+
+        await PlanChangeEvent.objects.filter(id=upgrade.id).aupdate(
+            next_attempt_at=timezone.now()
+        )
+        await dispatcher.run(once=True)
+        delivered = [sink.queue.get_nowait()["id"] for _ in range(2)]
+        self.assertEqual(delivered, [upgrade.id, downgrade.id])
+        self.assertFalse(await dispatcher.pending().aexists())
+
+    async def test_requeue_failed_events(self):
+        """Test that failed events get delivered once requeued"""
+        event = await PlanChangeEvent.objects.acreate(
+            user_id=self.user.id, old_plan="HOBBY", new_plan="PRO"
+        )
+        await OutboxDispatcher([FailingSink()], max_attempts=1, backoff=0).run(once=True)
+        sink = QueueSink()
+        dispatcher = OutboxDispatcher([sink], max_attempts=1)
+
+        self.assertEqual(await dispatcher.requeue_failed(), 1)
+        await dispatcher.run(once=True)
+
+        await event.arefresh_from_db()
+        self.assertIsNotNone(event.delivered_at)
+        self.assertEqual(sink.queue.get_nowait()["id"], event.id)
+        self.assertFalse(await dispatcher.failed().aexists())
@@ -1,6 +1,13 @@
+from contextvars import ContextVar
 from strawberry.dataloader import DataLoader
+from strawberry.extensions import SchemaExtension
 from apps.users.models import User
-from apps.deployedapps.models import DeployedApp
+from apps.deployedapps.models import ArchivedApp, DeployedApp
+
+
+def app_models(include_archived=False):
+    """Tables to read apps from; the archive is only read on request"""
+    return [DeployedApp, ArchivedApp] if include_archived else [DeployedApp]
 
 
 async def load_users(keys):
@@ -8,13 +15,58 @@ async def load_users(keys):
     return [users.get(key) for key in keys]
 
 
-async def load_apps_by_owner(keys):
+async def _load_by_owner(model, keys):
     apps_by_owner = {}
-    async for app in DeployedApp.objects.filter(owner_id__in=keys):
+    async for app in model.objects.filter(owner_id__in=keys):
         owner_id = app.owner_id  # type: ignore
         apps_by_owner.setdefault(owner_id, []).append(app)
     return [apps_by_owner.get(key, []) for key in keys]
 
 
-user_loader = DataLoader(load_fn=load_users)
-apps_by_owner_loader = DataLoader(load_fn=load_apps_by_owner)
+async def load_apps_by_owner(keys):
+    return await _load_by_owner(DeployedApp, keys)
+
+
+async def load_archived_apps_by_owner(keys):
+    return await _load_by_owner(ArchivedApp, keys)
+
+
+class Loaders:
+    """DataLoaders scoped to a single GraphQL execution"""
+
+    def __init__(self):
+        self.user = DataLoader(load_fn=load_users)
+        self.apps_by_owner = DataLoader(load_fn=load_apps_by_owner)
+        self.archived_apps_by_owner = DataLoader(load_fn=load_archived_apps_by_owner)
+
+
+_loaders: ContextVar[Loaders] = ContextVar("loaders")
+
+
+class DataLoaderExtension(SchemaExtension):
+    """
+    Give every execution fresh loaders, so results are never cached across
+    requests and each loader is bound to the running event loop.
+    """
+
+    def on_execute(self):
+        token = _loaders.set(Loaders())
+        yield
+        _loaders.reset(token)
+
+
+def get_loaders():
+    loaders = _loaders.get(None)
+    if loaders is None:
+        # Outside DataLoaderExtension: no batching across resolvers, but correct
+        loaders = Loaders()
+    return loaders
+
+
+async def load_owner_apps(owner_id, include_archived=False):
+    """Apps owned by ``owner_id``, hot table first"""
+    loaders = get_loaders()
+    apps = await loaders.apps_by_owner.load(owner_id)
+    if include_archived:
+        apps = apps + await loaders.archived_apps_by_owner.load(owner_id)
+    return apps
@@ -0,0 +1,40 @@
+from django.conf import settings
+from strawberry.types.nodes import FragmentSpread, InlineFragment
+
+
+def selected(selections, name):
+    """Yield the fields called ``name`` in ``selections``, looking into fragments"""
+    for selection in selections:
+        if isinstance(selection, (FragmentSpread, InlineFragment)):
+            yield from selected(selection.selections, name)
+        elif selection.name == name:
+            yield selection
+
+
+def _children(info, name):
+    return [
+        child
+        for field in info.selected_fields
+        for child in selected(field.selections, name)
+    ]
+
+
+def user_prefetches(info):
+    """
+    Relations to prefetch for a list of users so that ``User.apps`` can
+    resolve from memory instead of going through the loaders.
+    """
+    if not settings.GRAPHQL_PREFETCH_SELECTIONS:
+        return []
+    apps = _children(info, "apps")
+    lookups = ["apps"] if apps else []
+    if any(field.arguments.get("includeArchived") for field in apps):
+        lookups.append("archived_apps")
+    return lookups
+
+
+def app_select_related(info):
+    """Relations to join for a list of apps so ``App.owner`` needs no query"""
+    if not settings.GRAPHQL_PREFETCH_SELECTIONS:
+        return []
+    return ["owner"] if _children(info, "owner") else []
@@ -0,0 +1,184 @@
+import asyncio
+import contextvars
+import secrets
+import sys
+import threading
+import time
+import uuid
+import weakref
+from collections import Counter
+from pathlib import Path
+from django.conf import settings
+from strawberry.extensions import SchemaExtension
+
+PROFILE_HEADER = "X-GraphQL-Profile"
+
+# The profiler of the execution running in the current context. Tasks and
+# sync_to_async calls made by its resolvers inherit it.
+_current_profiler = contextvars.ContextVar("current_profiler", default=None)
+# Event loops with the marking task factory installed: loop -> (users, previous)
+_marked_loops = {}
+
+
+def _marking_task_factory(loop, coro, **kwargs):
+    previous = _marked_loops[loop][1]
+    if previous is not None:
+        task = previous(loop, coro, **kwargs)
+    else:
+        task = asyncio.Task(coro, loop=loop, **kwargs)
+    # The factory runs in the creating task's context
+    profiler = _current_profiler.get()
+    if profiler is not None:
+        profiler.tasks.add(task)
+    return task
+
+
+def _install_task_marker(loop):
+    users, previous = _marked_loops.get(loop, (0, loop.get_task_factory()))
+    _marked_loops[loop] = (users + 1, previous)
+    loop.set_task_factory(_marking_task_factory)
+
+
+def _remove_task_marker(loop):
+    users, previous = _marked_loops.pop(loop)
+    if users > 1:
+        _marked_loops[loop] = (users - 1, previous)
+    else:
+        loop.set_task_factory(previous)
+
+
+class SamplingProfiler:
+    """
+    Periodically sample the stacks of the execution being profiled.
+
+    Samples from the event loop thread are kept only while one of the
+    execution's own tasks is running, and are rooted at that task. Samples
+    from other threads are kept only while they run a sync_to_async call
+    made from the execution (found via the context asgiref runs it in), so
+    concurrent requests on the same worker are left out.
+    """
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        self.tasks = weakref.WeakSet([asyncio.current_task()])
+        self.stacks = Counter()
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="graphql-profiler", daemon=True
+        )
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self._started
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                if ident not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                root = self._root(ident, frame, names)
+                if root is not None:
+                    self.stacks[";".join([root, *self._frames(frame)])] += 1
+
+    def _root(self, ident, frame, names):
+        """Name the stack's root, or None if it belongs to another execution"""
+        if ident == self.loop_thread:
+            task = asyncio.current_task(self.loop)
+            return f"task {task.get_name()}" if task in self.tasks else None
+        if self._runs_our_sync_call(frame):
+            return f"thread {names.get(ident, ident)}"
+        return None
+
+    def _runs_our_sync_call(self, frame):
+        # asgiref's SyncToAsync runs the sync function from a closure named
+        # run_child with the caller's copied context in scope
+        while frame is not None:
+            code = frame.f_code
+            if code.co_name == "run_child" and "asgiref" in code.co_filename:
+                context = frame.f_locals.get("context")
+                return context is not None and context.get(_current_profiler) is self
+            frame = frame.f_back
+        return False
+
+    @staticmethod
+    def _frames(frame):
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            name = f"{code.co_qualname} ({code.co_filename}:{code.co_firstlineno})"
+            frames.append(name.replace(";", ":"))
+            frame = frame.f_back
+        return reversed(frames)
+
+    def write_collapsed(self, path):
+        """Write folded stacks, readable by speedscope and flamegraph.pl"""
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class ProfilingExtension(SchemaExtension):
+    """
+    Profile a single execution when the request carries the profiling header
+    with the configured token, and link the output from ``extensions``.
+    """
+
+    profile = None
+
+    def on_execute(self):
+        if not self._requested():
+            yield
+            return
+        profiler = SamplingProfiler(settings.GRAPHQL_PROFILING_INTERVAL)
+        token = _current_profiler.set(profiler)
+        _install_task_marker(profiler.loop)
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            _remove_task_marker(profiler.loop)
+            _current_profiler.reset(token)
+            self.profile = self._write(profiler)
+
+    def get_results(self):
+        return {"profile": self.profile} if self.profile else {}
+
+    def _requested(self):
+        request = getattr(self.execution_context.context, "request", None)
+        token = settings.GRAPHQL_PROFILING_TOKEN
+        if request is None or not token:
+            return False
+        supplied = request.headers.get(PROFILE_HEADER, "")
+        return secrets.compare_digest(supplied.encode(), token.encode())
+
+    def _write(self, profiler):
+        directory = Path(settings.GRAPHQL_PROFILING_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        operation = self.execution_context.operation_name or "anonymous"
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{operation}-{uuid.uuid4().hex[:8]}"
+        path = directory / f"{name}.collapsed"
+        profiler.write_collapsed(path)
+        return {
+            "file": str(path),
+            "format": "collapsed",
+            "samples": sum(profiler.stacks.values()),
+            "durationMs": round(profiler.duration * 1000, 3),
+        }
+
+
+def profiling_extensions():
+    """Only install the extension when profiling is configured"""
+    return [ProfilingExtension] if settings.GRAPHQL_PROFILING_TOKEN else []
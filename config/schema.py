@@ -1,11 +1,23 @@
 import strawberry
+from asgiref.sync import sync_to_async
+from django.db.models import prefetch_related_objects
 from strawberry import relay
+from strawberry.schema.schema import StrawberryGraphQLCoreExecutionContext
 from strawberry.types import Info
 from typing import Optional, List, Union
 from enum import Enum
 from apps.users.models import User as UserModel, PlanChoices
 from apps.deployedapps.models import DeployedApp as DeployedAppModel
-from config.dataloaders import apps_by_owner_loader
+from apps.users.outbox import change_plan
+from apps.users.search import search_users
+from config.dataloaders import (
+    DataLoaderExtension,
+    app_models,
+    get_loaders,
+    load_owner_apps,
+)
+from config.prefetch import app_select_related, user_prefetches
+from config.profiling import profiling_extensions
 
 
 @strawberry.enum
@@ -19,6 +31,9 @@ class User(relay.Node):
     id: strawberry.ID  # Use strawberry.ID for Relay compatibility
     username: str
     plan: Plan
+    # Filled in when the list resolver prefetched the apps for this selection
+    prefetched_apps: strawberry.Private[Optional[list]] = None
+    prefetched_archived_apps: strawberry.Private[Optional[list]] = None
 
     @classmethod
     def resolve_id(cls, root, info: Optional[Info] = None) -> str:
@@ -37,25 +52,46 @@ class User(relay.Node):
         return [users_dict.get(nid) for nid in node_ids]
 
     @strawberry.field
-    async def apps(self) -> List["App"]:
+    def apps(self, include_archived: bool = False) -> List["App"]:
+        # Resolve synchronously when the apps were prefetched, otherwise
+        # return a coroutine that batches through the loaders
+        apps = self.prefetched_apps
+        if apps is not None and include_archived:
+            archived = self.prefetched_archived_apps
+            apps = None if archived is None else apps + archived
+        if apps is None:
+            return self.load_apps(include_archived)
+        return [App.from_model(app) for app in apps]
+
+    async def load_apps(self, include_archived: bool) -> List["App"]:
         # Use raw ID directly
         user_id = self.id
-        apps = await apps_by_owner_loader.load(user_id)
+        apps = await load_owner_apps(user_id, include_archived)
         return [App.from_model(app) for app in apps]
 
     @classmethod
     def from_model(cls, model: UserModel) -> "User":
+        prefetched = getattr(model, "_prefetched_objects_cache", {})
         return cls(
             id=strawberry.ID(model.id),
             username=model.username,
             plan=getattr(Plan, model.plan),
+            prefetched_apps=_cached_list(prefetched, "apps"),
+            prefetched_archived_apps=_cached_list(prefetched, "archived_apps"),
         )
 
 
+def _cached_list(prefetched, name):
+    return list(prefetched[name]) if name in prefetched else None
+
+
 @strawberry.type
 class App(relay.Node):
     id: strawberry.ID  # Use strawberry.ID for Relay compatibility
     active: bool
+    owner_id: strawberry.Private[str]
+    # Set when the owner was loaded together with the app
+    owner_model: strawberry.Private[Optional[UserModel]] = None
 
     @classmethod
     def resolve_id(cls, root, info: Optional[Info] = None) -> str:
@@ -74,20 +110,24 @@ class App(relay.Node):
         return [apps_dict.get(nid) for nid in node_ids]
 
     @strawberry.field
-    async def owner(self) -> User:
-        # Use raw ID directly
-        app_id = self.id
-        app = [
-            app
-            async for app in DeployedAppModel.objects.select_related("owner").filter(
-                id=app_id
-            )
-        ][0]
-        return User.from_model(app.owner)
+    def owner(self) -> User:
+        if self.owner_model is not None:
+            return User.from_model(self.owner_model)
+        return self.load_owner()
+
+    async def load_owner(self) -> User:
+        # Batched with the owners of every other app in this execution
+        return User.from_model(await get_loaders().user.load(self.owner_id))
 
     @classmethod
     def from_model(cls, model: DeployedAppModel) -> "App":
-        return cls(id=strawberry.ID(model.id), active=model.active)
+        owner = model.owner if type(model).owner.is_cached(model) else None
+        return cls(
+            id=strawberry.ID(model.id),
+            active=model.active,
+            owner_id=model.owner_id,
+            owner_model=owner,
+        )
 
 
 @strawberry.type
@@ -103,14 +143,15 @@ class Mutation:
     async def upgrade_account(self, user_id: str) -> MutationPayload:
         try:
             user = await UserModel.objects.aget(id=user_id)
-            if user.plan == PlanChoices.PRO:
+            # change_plan re-checks atomically, in case of a concurrent change
+            if user.plan == PlanChoices.PRO or not await sync_to_async(
+                change_plan
+            )(user, PlanChoices.PRO):
                 return MutationPayload(
                     user=User.from_model(user),
                     success=False,
                     message="User is already on Pro plan",
                 )
-            user.plan = PlanChoices.PRO
-            await user.asave()
             return MutationPayload(
                 user=User.from_model(user),
                 success=True,
@@ -125,14 +166,15 @@ class Mutation:
     async def downgrade_account(self, user_id: str) -> MutationPayload:
         try:
             user = await UserModel.objects.aget(id=user_id)
-            if user.plan == PlanChoices.HOBBY:
+            # change_plan re-checks atomically, in case of a concurrent change
+            if user.plan == PlanChoices.HOBBY or not await sync_to_async(
+                change_plan
+            )(user, PlanChoices.HOBBY):
                 return MutationPayload(
                     user=User.from_model(user),
                     success=False,
                     message="User is already on Hobby plan",
                 )
-            user.plan = PlanChoices.HOBBY
-            await user.asave()
             return MutationPayload(
                 user=User.from_model(user),
                 success=True,
@@ -168,12 +210,59 @@ class Query:
         return None
 
     @strawberry.field
-    async def users(self) -> List[User]:
-        return [User.from_model(u) async for u in UserModel.objects.all()]
+    async def users(self, info: Info) -> List[User]:
+        users = UserModel.objects.prefetch_related(*user_prefetches(info))
+        return [User.from_model(u) async for u in users]
 
     @strawberry.field
-    async def apps(self) -> List[App]:
-        return [App.from_model(a) async for a in DeployedAppModel.objects.all()]
+    async def search_users(
+        self,
+        info: Info,
+        term: str,
+        first: int = 20,
+        offset: int = 0,
+        prefix: bool = False,
+    ) -> List[User]:
+        """
+        Search users by username, ranked by relevance.
+        With prefix=true only usernames starting with the term are returned.
+        """
+        users = await sync_to_async(search_users)(
+            term, first=first, offset=offset, prefix=prefix
+        )
+        if lookups := user_prefetches(info):
+            await sync_to_async(prefetch_related_objects)(users, *lookups)
+        return [User.from_model(u) for u in users]
+
+    @strawberry.field
+    async def apps(self, info: Info, include_archived: bool = False) -> List[App]:
+        # select_related() without arguments would follow every relation
+        related = app_select_related(info)
+        querysets = [
+            model.objects.select_related(*related) if related else model.objects.all()
+            for model in app_models(include_archived)
+        ]
+        return [App.from_model(a) for queryset in querysets async for a in queryset]
+
+
+class ExecutionContext(StrawberryGraphQLCoreExecutionContext):
+    """
+    Work around graphql-core 3.3 memoizing subfield collection by the id() of
+    FieldDetails objects: once one is freed its id can be reused by another
+    field's, which then resolves with the wrong selection. Keeping every
+    FieldDetails seen during the execution alive makes the ids unique.
+    """
+
+    def collect_subfields(self, return_type, field_details_list):
+        pinned = self.__dict__.setdefault("_pinned_field_details", {})
+        for field_details in field_details_list:
+            pinned.setdefault(id(field_details), field_details)
+        return super().collect_subfields(return_type, field_details_list)
 
 
-schema = strawberry.Schema(query=Query, mutation=Mutation)
+schema = strawberry.Schema(
+    query=Query,
+    mutation=Mutation,
+    extensions=[DataLoaderExtension, *profiling_extensions()],
+    execution_context_class=ExecutionContext,
+)
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import os
+import time
+
+logger = logging.getLogger("config.serve")
+
+# Touches the FTS search, the app loaders and App.owner without reading
+# whole tables, so it is cheap regardless of data size.
+WARMUP_QUERY = """
+query warmup {
+    searchUsers(term: "warmup", first: 1) {
+        id
+        apps { id owner { id } }
+    }
+    node(id: "u_warmup") { __typename }
+}
+"""
+
+
+class ServerApplication:
+    """
+    ASGI wrapper used by the ``serve`` command.
+
+    Django does not speak the lifespan protocol, so this handles it: startup
+    warms the worker up before it accepts connections, and shutdown (after
+    uvicorn has drained in-flight requests) logs the final load report.
+    """
+
+    def __init__(self, app, warmup=True, report_interval=30.0):
+        self.app = app
+        self.warmup = warmup
+        self.report_interval = report_interval
+        self.in_flight = 0
+        self.served = 0
+        self._reported = (time.monotonic(), 0)
+        self._reporter = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+            self.served += 1
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    if self.warmup:
+                        await self.warm_up()
+                except Exception as exc:
+                    await send({"type": "lifespan.startup.failed", "message": str(exc)})
+                    return
+                if self.report_interval:
+                    self._reporter = asyncio.create_task(self.report_periodically())
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self._reporter:
+                    self._reporter.cancel()
+                self.report()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def warm_up(self):
+        """Build the schema and run a query so the first request is not cold"""
+        started = time.monotonic()
+        from config.schema import schema
+
+        result = await schema.execute(WARMUP_QUERY)
+        if result.errors:
+            raise RuntimeError(f"Warm-up query failed: {result.errors[0].message}")
+        logger.info(
+            "Worker %s warmed up in %.0fms", os.getpid(), (time.monotonic() - started) * 1000
+        )
+
+    async def report_periodically(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            # Stay quiet while the worker is idle
+            if self.in_flight or self.served != self._reported[1]:
+                self.report()
+
+    def report(self):
+        now = time.monotonic()
+        since, served = self._reported
+        rate = (self.served - served) / max(now - since, 1e-6)
+        self._reported = (now, self.served)
+        logger.info(
+            "Worker %s: %d in flight, %d served, %.1f req/s",
+            os.getpid(),
+            self.in_flight,
+            self.served,
+            rate,
+        )
+
+
+def create_application():
+    """uvicorn factory, called once in every worker process"""
+    from config.asgi import application
+
+    return ServerApplication(
+        application,
+        warmup=os.environ.get("GRAPHQL_SERVE_WARMUP", "1") == "1",
+        report_interval=float(os.environ.get("GRAPHQL_SERVE_REPORT_INTERVAL", "30")),
+    )
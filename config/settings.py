@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -24,3 +25,26 @@ DATABASES = {
 }
 STATIC_URL = "static/"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Prefetch child relations in list resolvers based on the selection set, so
+# nested fields resolve from memory. Disable to always use the dataloaders.
+GRAPHQL_PREFETCH_SELECTIONS = True
+
+# On-demand profiling: when a token is set, a request sending the header
+# "X-GraphQL-Profile: <token>" is sampled and the folded stacks are written
+# to GRAPHQL_PROFILING_DIR. Without a token the extension is not installed.
+GRAPHQL_PROFILING_TOKEN = os.environ.get("GRAPHQL_PROFILING_TOKEN", "")
+GRAPHQL_PROFILING_DIR = BASE_DIR / "profiles"
+GRAPHQL_PROFILING_INTERVAL = 0.001
+
+# Plan change outbox: dispatch_outbox delivers events to these sinks, given as
+# (import path, kwargs). Use apps.users.outbox.WebhookSink in production.
+OUTBOX_SINKS = [
+    ("apps.users.outbox.FileSink", {"path": BASE_DIR / "plan_changes.jsonl"}),
+]
+OUTBOX_BATCH_SIZE = 100
+# Retries wait OUTBOX_BACKOFF seconds, doubling each time: 10 attempts from
+# 30s cover a sink outage of about four hours before events are marked failed.
+OUTBOX_MAX_ATTEMPTS = 10
+OUTBOX_BACKOFF = 30.0
+OUTBOX_POLL_INTERVAL = 1.0
@@ -0,0 +1,65 @@
+import csv
+import json
+from apps.users.models import User
+from apps.deployedapps.models import ArchivedApp, DeployedApp
+
+# Models handled by export_data / import_data, in dependency order
+# (owners must be imported before their apps).
+MODELS = {
+    "users": User,
+    "deployedapps": DeployedApp,
+    "archivedapps": ArchivedApp,
+}
+FORMATS = ["jsonl", "csv"]
+
+
+def model_fields(model):
+    return [f for f in model._meta.concrete_fields]
+
+
+def serialize(model, obj):
+    """Flatten a model instance into a dict keyed by column attname"""
+    row = {}
+    for field in model_fields(model):
+        value = getattr(obj, field.attname)
+        row[field.attname] = value.isoformat() if hasattr(value, "isoformat") else value
+    return row
+
+
+def deserialize(model, row):
+    """Build an unsaved model instance from a serialized row"""
+    values = {}
+    for field in model_fields(model):
+        value = row.get(field.attname)
+        if value == "" and field.null:
+            value = None
+        values[field.attname] = field.to_python(value)
+    return model(**values)
+
+
+def write_rows(fmt, stream, label, model, rows):
+    """Write serialized rows to ``stream``; returns the number written"""
+    count = 0
+    if fmt == "csv":
+        writer = csv.DictWriter(stream, [f.attname for f in model_fields(model)])
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    else:
+        for row in rows:
+            stream.write(json.dumps({"model": label, **row}) + "\n")
+            count += 1
+    return count
+
+
+def read_rows(fmt, stream, label=None):
+    """Yield (label, row) pairs from a JSONL stream or a single-model CSV"""
+    if fmt == "csv":
+        for row in csv.DictReader(stream):
+            yield label, row
+    else:
+        for line in stream:
+            if line.strip():
+                row = json.loads(line)
+                yield row.pop("model"), row
@@ -1,8 +1,18 @@
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
 import pytest
-from django.test import TestCase
-from apps.users.models import User, PlanChoices
-from apps.deployedapps.models import DeployedApp
-from config.schema import schema
+import strawberry
+from asgiref.sync import sync_to_async
+from django.test import RequestFactory, TestCase
+from apps.users.models import PlanChangeEvent, User, PlanChoices
+from apps.deployedapps.models import ArchivedApp, DeployedApp
+from config.dataloaders import DataLoaderExtension, load_users
+from config.profiling import PROFILE_HEADER, ProfilingExtension
+from config.schema import Mutation, Query, schema
 
 
 @pytest.mark.asyncio
@@ -184,6 +194,12 @@ class GraphQLMutationTest(TestCase):
         user = await User.objects.aget(id=self.user.id)
         self.assertEqual(user.plan, PlanChoices.PRO)
 
+        # The change is recorded in the outbox
+        event = await PlanChangeEvent.objects.aget(user_id=self.user.id)
+        self.assertEqual(event.old_plan, PlanChoices.HOBBY)
+        self.assertEqual(event.new_plan, PlanChoices.PRO)
+        self.assertIsNone(event.delivered_at)
+
     async def test_upgrade_already_pro_account(self):
         """Test upgrading an account that is already Pro"""
         await self.asyncSetUp()
@@ -206,6 +222,7 @@ class GraphQLMutationTest(TestCase):
         self.assertIsNone(result.errors)
         self.assertFalse(result.data["upgradeAccount"]["success"])
         self.assertIn("already on Pro", result.data["upgradeAccount"]["message"])
+        self.assertFalse(await PlanChangeEvent.objects.aexists())
 
     async def test_downgrade_account(self):
         """Test downgrading an account to Hobby"""
@@ -273,3 +290,313 @@ class GraphQLMutationTest(TestCase):
         self.assertIsNone(result.errors)
         self.assertFalse(result.data["upgradeAccount"]["success"])
         self.assertIn("not found", result.data["upgradeAccount"]["message"])
+
+
+@pytest.mark.asyncio
+class GraphQLSearchTest(TestCase):
+    """Test the searchUsers query"""
+
+    async def asyncSetUp(self):
+        """Set up test data"""
+        for name in ["alice", "malice", "bob"]:
+            await User.objects.acreate(username=name)
+
+    async def test_search_users(self):
+        """Test substring search by username"""
+        await self.asyncSetUp()
+
+        query = """
+        query {
+            searchUsers(term: "lic") {
+                id
+                username
+            }
+        }
+        """
+
+        result = await schema.execute(query)
+
+        self.assertIsNone(result.errors)
+        usernames = [u["username"] for u in result.data["searchUsers"]]
+        self.assertCountEqual(usernames, ["alice", "malice"])
+
+    async def test_search_users_prefix(self):
+        """Test prefix search with pagination"""
+        await self.asyncSetUp()
+
+        query = """
+        query {
+            searchUsers(term: "ali", prefix: true, first: 5) {
+                username
+            }
+        }
+        """
+
+        result = await schema.execute(query)
+
+        self.assertIsNone(result.errors)
+        self.assertEqual(result.data["searchUsers"], [{"username": "alice"}])
+
+
+@pytest.mark.asyncio
+class GraphQLArchivedAppsTest(TestCase):
+    """Test reading archived apps"""
+
+    async def asyncSetUp(self):
+        """Set up test data"""
+        self.user = await User.objects.acreate(username="archiver")
+        self.hot = await DeployedApp.objects.acreate(owner=self.user, active=True)
+        self.archived = await ArchivedApp.objects.acreate(owner=self.user, active=False)
+
+    async def test_apps_default_to_hot_table(self):
+        """Test that archived apps are hidden by default"""
+        await self.asyncSetUp()
+
+        query = """
+        query {
+            apps { id }
+            users { apps { id } }
+        }
+        """
+
+        result = await schema.execute(query)
+
+        self.assertIsNone(result.errors)
+        self.assertEqual(result.data["apps"], [{"id": self.hot.id}])
+        self.assertEqual(result.data["users"][0]["apps"], [{"id": self.hot.id}])
+
+    async def test_include_archived(self):
+        """Test that includeArchived reads both tables"""
+        await self.asyncSetUp()
+
+        query = """
+        query {
+            apps(includeArchived: true) {
+                id
+                owner { username }
+            }
+            users { apps(includeArchived: true) { id active } }
+        }
+        """
+
+        result = await schema.execute(query)
+
+        self.assertIsNone(result.errors)
+        self.assertCountEqual(
+            [a["id"] for a in result.data["apps"]], [self.hot.id, self.archived.id]
+        )
+        self.assertEqual(result.data["apps"][1]["owner"]["username"], "archiver")
+        self.assertEqual(
+            result.data["users"][0]["apps"],
+            [{"id": self.hot.id, "active": True}, {"id": self.archived.id, "active": False}],
+        )
+
+
+def spin(seconds):
+    """Keep the event loop thread busy so the profiler has something to sample"""
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def busy_sync_call():
+    """Stand-in for ORM work run in a worker thread through sync_to_async"""
+    spin(0.05)
+
+
+@strawberry.type
+class SlowQuery(Query):
+    @strawberry.field
+    async def profiled_work(self) -> bool:
+        for _ in range(5):
+            spin(0.01)
+            await asyncio.sleep(0)
+        return True
+
+    @strawberry.field
+    async def profiled_sync_work(self) -> bool:
+        await sync_to_async(busy_sync_call)()
+        return True
+
+    @strawberry.field
+    async def concurrent_work(self) -> bool:
+        for _ in range(5):
+            spin(0.01)
+            await asyncio.sleep(0)
+        return True
+
+
+@pytest.mark.asyncio
+class GraphQLProfilingTest(TestCase):
+    """Test on-demand profiling of a single execution"""
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.profile_dir = Path(tmpdir.name)
+        self.schema = strawberry.Schema(
+            query=SlowQuery,
+            mutation=Mutation,
+            extensions=[DataLoaderExtension, ProfilingExtension],
+        )
+
+    def context(self, **headers):
+        return SimpleNamespace(request=RequestFactory().post("/graphql/", headers=headers))
+
+    async def execute(self, query, **headers):
+        return await self.schema.execute(query, context_value=self.context(**headers))
+
+    def profiling(self):
+        return self.settings(
+            GRAPHQL_PROFILING_TOKEN="secret", GRAPHQL_PROFILING_DIR=self.profile_dir
+        )
+
+    async def test_profile_with_valid_token(self):
+        """Test that the profile is written and linked from extensions"""
+        await User.objects.acreate(username="profiled")
+
+        with self.profiling():
+            result = await self.execute(
+                "query slowUsers { profiledWork users { username apps { id } } }",
+                **{PROFILE_HEADER: "secret"},
+            )
+
+        self.assertIsNone(result.errors)
+        profile = result.extensions["profile"]
+        self.assertEqual(profile["format"], "collapsed")
+        self.assertGreater(profile["samples"], 0)
+        path = Path(profile["file"])
+        self.assertEqual(path.parent, self.profile_dir)
+        self.assertIn("slowUsers", path.name)
+        stacks = []
+        for line in path.read_text().splitlines():
+            stack, count = line.rsplit(" ", 1)
+            self.assertTrue(count.isdigit())
+            stacks.append(stack)
+        self.assertTrue(any(stack.startswith("task ") for stack in stacks))
+        self.assertTrue(any("profiled_work" in stack for stack in stacks))
+
+    async def test_profile_attributes_sync_to_async_threads(self):
+        """Test that sync work run for the execution is sampled in its thread"""
+        with self.profiling():
+            result = await self.execute(
+                "query { profiledSyncWork }", **{PROFILE_HEADER: "secret"}
+            )
+
+        self.assertIsNone(result.errors)
+        text = Path(result.extensions["profile"]["file"]).read_text()
+        self.assertTrue(
+            any(
+                line.startswith("thread ") and "busy_sync_call" in line
+                for line in text.splitlines()
+            ),
+            text,
+        )
+
+    async def test_profile_excludes_concurrent_executions(self):
+        """Test that only the profiled execution's tasks are sampled"""
+        with self.profiling():
+            profiled, other = await asyncio.gather(
+                self.execute("query { profiledWork }", **{PROFILE_HEADER: "secret"}),
+                self.execute("query { concurrentWork }"),
+            )
+
+        self.assertIsNone(profiled.errors)
+        self.assertIsNone(other.errors)
+        text = Path(profiled.extensions["profile"]["file"]).read_text()
+        self.assertIn("profiled_work", text)
+        self.assertNotIn("concurrent_work", text)
+
+    async def test_no_profile_without_token(self):
+        """Test that requests without a valid token are not profiled"""
+        with self.profiling():
+            result = await self.execute(
+                "query { users { username } }", **{PROFILE_HEADER: "wrong"}
+            )
+
+        self.assertIsNone(result.errors)
+        self.assertNotIn("profile", result.extensions or {})
+        self.assertEqual(list(self.profile_dir.iterdir()), [])
+
+
+@pytest.mark.asyncio
+class GraphQLPrefetchTest(TestCase):
+    """Test that list resolvers prefetch the selected children"""
+
+    async def asyncSetUp(self):
+        """Set up test data"""
+        self.user = await User.objects.acreate(username="prefetched")
+        self.app = await DeployedApp.objects.acreate(owner=self.user)
+        self.archived = await ArchivedApp.objects.acreate(owner=self.user, active=False)
+
+    async def execute_without_loaders(self, query):
+        """Execute ``query``, failing if a child field needs its own query"""
+        unexpected = AssertionError("child field was not prefetched")
+        with patch("config.schema.load_owner_apps", side_effect=unexpected), patch(
+            "config.schema.App.load_owner", side_effect=unexpected
+        ):
+            return await schema.execute(query)
+
+    async def test_users_prefetch_apps_and_owner(self):
+        """Test that User.apps and App.owner resolve from the prefetch"""
+        await self.asyncSetUp()
+
+        query = """
+        query {
+            users {
+                ... on User {
+                    apps(includeArchived: true) { id owner { username } }
+                }
+            }
+        }
+        """
+
+        result = await self.execute_without_loaders(query)
+
+        self.assertIsNone(result.errors)
+        apps = result.data["users"][0]["apps"]
+        self.assertEqual([a["id"] for a in apps], [self.app.id, self.archived.id])
+        self.assertEqual(apps[0]["owner"]["username"], "prefetched")
+
+    async def test_apps_select_owner(self):
+        """Test that App.owner resolves from the joined owner"""
+        await self.asyncSetUp()
+
+        result = await self.execute_without_loaders("query { apps { owner { username } } }")
+
+        self.assertIsNone(result.errors)
+        self.assertEqual(result.data["apps"], [{"owner": {"username": "prefetched"}}])
+
+    async def test_falls_back_to_loaders(self):
+        """Test that children still resolve when prefetching is disabled"""
+        await self.asyncSetUp()
+
+        with self.settings(GRAPHQL_PREFETCH_SELECTIONS=False):
+            result = await schema.execute("query { users { apps { id } } }")
+
+        self.assertIsNone(result.errors)
+        self.assertEqual(result.data["users"][0]["apps"], [{"id": self.app.id}])
+
+    async def test_loaders_batch_owner_lookups(self):
+        """Test that App.owner goes through one batched load without prefetching"""
+        await self.asyncSetUp()
+        for name in ["second", "third"]:
+            owner = await User.objects.acreate(username=name)
+            await DeployedApp.objects.acreate(owner=owner)
+            await DeployedApp.objects.acreate(owner=owner)
+
+        with self.settings(GRAPHQL_PREFETCH_SELECTIONS=False), patch(
+            "config.dataloaders.load_users", wraps=load_users
+        ) as loader:
+            result = await schema.execute("query { users { apps { owner { username } } } }")
+
+        self.assertIsNone(result.errors)
+        owners = [
+            app["owner"]["username"] for user in result.data["users"] for app in user["apps"]
+        ]
+        self.assertCountEqual(owners, ["prefetched", "second", "second", "third", "third"])
+        loader.assert_awaited_once()
+        self.assertCountEqual(
+            loader.await_args.args[0],
+            [user_id async for user_id in User.objects.values_list("id", flat=True)],
+        )
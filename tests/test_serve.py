@@ -0,0 +1,63 @@
+import pytest
+from django.test import TestCase
+from config.serve import ServerApplication
+
+
+class Messages:
+    """Minimal ASGI receive/send pair for driving the lifespan protocol"""
+
+    def __init__(self, *incoming):
+        self.incoming = list(incoming)
+        self.sent = []
+
+    async def receive(self):
+        return {"type": self.incoming.pop(0)}
+
+    async def send(self, message):
+        self.sent.append(message["type"])
+
+
+@pytest.mark.asyncio
+class ServerApplicationTest(TestCase):
+    """Test the ASGI wrapper used by the serve command"""
+
+    async def test_lifespan_warms_up(self):
+        """Test that startup runs the warm-up query and completes"""
+        app = ServerApplication(None, warmup=True, report_interval=0)
+        messages = Messages("lifespan.startup", "lifespan.shutdown")
+
+        await app({"type": "lifespan"}, messages.receive, messages.send)
+
+        self.assertEqual(
+            messages.sent, ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+        )
+
+    async def test_failed_warmup_aborts_startup(self):
+        """Test that a failing warm-up keeps the worker from starting"""
+        app = ServerApplication(None, report_interval=0)
+
+        async def broken():
+            raise RuntimeError("no database")
+
+        app.warm_up = broken
+        messages = Messages("lifespan.startup")
+
+        await app({"type": "lifespan"}, messages.receive, messages.send)
+
+        self.assertEqual(messages.sent, ["lifespan.startup.failed"])
+
+    async def test_tracks_load(self):
+        """Test in-flight and served request counters"""
+        seen = []
+
+        async def inner(scope, receive, send):
+            seen.append(app.in_flight)
+
+        app = ServerApplication(inner)
+
+        await app({"type": "http"}, None, None)
+        await app({"type": "http"}, None, None)
+
+        self.assertEqual(seen, [1, 1])
+        self.assertEqual(app.in_flight, 0)
+        self.assertEqual(app.served, 2)